@@ -0,0 +1,14 @@
+from botocore.config import Config
+
+
+def make_client_config(max_attempts: int) -> Config:
+    """Get the botocore Config shared by the moto3 AWS clients.
+
+    Connections are kept alive and pooled for the worker threads, and
+    throttling is handled by botocore's adaptive retry mode.
+    """
+    return Config(
+        max_pool_connections=64,
+        tcp_keepalive=True,
+        retries={"mode": "adaptive", "max_attempts": max_attempts},
+    )
@@ -0,0 +1,19 @@
+import logging
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Get a logger that writes INFO and above to stderr.
+
+    The handler is only attached the first time, so reloading a module does
+    not produce duplicate log lines.
+    """
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        logger.setLevel(logging.INFO)
+        handler = logging.StreamHandler()
+        formatter = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+        )
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    return logger
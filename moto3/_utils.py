@@ -0,0 +1,29 @@
+from concurrent.futures import FIRST_COMPLETED, Executor, as_completed, wait
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator
+
+
+def chunks(iterable: Iterable, n: int) -> Iterator[list]:
+    """Lazily split an iterable into lists of up to n items."""
+    it = iter(iterable)
+    while chunk := list(islice(it, n)):
+        yield chunk
+
+
+def map_bounded(
+    executor: Executor, fn: Callable, items: Iterable, window: int
+) -> Iterator[Any]:
+    """Like executor.map, but with at most window items submitted at a time.
+
+    executor.map consumes all of items up front, so a lazy iterable ends up
+    fully in memory. Results are yielded in completion order.
+    """
+    pending: set = set()
+    for item in items:
+        if len(pending) >= window:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+        pending.add(executor.submit(fn, item))
+    for future in as_completed(pending):
+        yield future.result()
@@ -1,154 +1,322 @@
+import asyncio
 import json
-import logging
-import multiprocessing
+import math
+import threading
 import time
-from multiprocessing import Pool
-from typing import Any, Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Iterator, Optional, Tuple
 
 import boto3
-import botocore
+import orjson
 from botocore.exceptions import ClientError
+from botocore.parsers import ResponseParserError
 from tqdm import tqdm
 
-# Configure the logger
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
+from moto3._config import make_client_config
+from moto3._log import get_logger
+from moto3._utils import chunks, map_bounded
 
-handler = logging.StreamHandler()
-formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+logger = get_logger(__name__)
 
-sqs_client = boto3.client("sqs")
-sqs_resource = boto3.resource("sqs")
+client_config = make_client_config(max_attempts=5)
+sqs_client = boto3.client("sqs", config=client_config)
+sqs_resource = boto3.resource("sqs", config=client_config)
 
+_QueueDoesNotExist = sqs_resource.meta.client.exceptions.QueueDoesNotExist
+# the error codes SQS uses for a missing queue over the query and JSON protocols
+_NONEXISTENT_QUEUE_CODES = (
+    "AWS.SimpleQueueService.NonExistentQueue",
+    "QueueDoesNotExist",
+)
 
-def _upload_batch(args):
-    batch, queue_url = args
-    sqs_client.send_message_batch(QueueUrl=queue_url, Entries=batch)
+# the maximum number of entries SQS accepts in a single send_message_batch call
+BATCH_SIZE = 10
 
+# the number of threads QueueManager.upload sends batches from
+UPLOAD_WORKERS = 32
 
-def _upload_batch_with_retry(args: tuple) -> Any:
-    batch, max_retries, sleep_time = args
-    for retry in range(max_retries):
-        try:
-            _upload_batch(batch)
-            return None  # If successful, return None
-        except botocore.parsers.ResponseParserError as e:
-            if retry < max_retries - 1:  # If not the last retry, sleep and retry
-                time.sleep(sleep_time)
-            else:  # If last retry, return the exception
-                return e
+# how long QueueManager.size reuses a fetched ApproximateNumberOfMessages, in seconds
+SIZE_CACHE_TTL = 1.0
+
+
+def _encode_body(message: Any) -> str:
+    try:
+        return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode()
+    except orjson.JSONEncodeError:
+        # orjson rejects integers beyond 64 bits, which the json module handles
+        return json.dumps(message)
+
+
+def _parse_body(body: str) -> Any:
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return body
 
 
 class QueueManager:
-    def __init__(self, queue_name: str) -> None:
+    def __init__(self, queue_name: str, delete_flush_interval: float = 1.0) -> None:
+        """Create a new QueueManager instance.
+
+        If the queue does not exist, it will be created.
+
+        Args:
+            queue_name (str): The name of the queue to use.
+            delete_flush_interval (float, optional): The maximum number of
+                seconds a message passed to delete() waits to be batched with
+                others before it is deleted. Defaults to 1.0.
+        """
         self.queue_name = queue_name
         self.queue_url = self._get_queue_url(queue_name)
+        self._queue = sqs_resource.Queue(self.queue_url)
+        self._size: Optional[int] = None
+        self._size_time = 0.0
+        self.delete_flush_interval = delete_flush_interval
+        self._pending_deletes: deque = deque()
+        self._delete_lock = threading.Lock()
+        self._delete_timer: Optional[threading.Timer] = None
 
     def _get_queue_url(self, queue_name):
         try:
             queue = sqs_resource.get_queue_by_name(QueueName=queue_name)
-            logger.info(f"Queue '{queue_name}' found.")
-        except sqs_resource.meta.client.exceptions.QueueDoesNotExist:
-            logger.warning(f"Queue '{queue_name}' not found. Creating a new queue.")
-            queue = sqs_resource.create_queue(QueueName=queue_name)
-            logger.info(f"Queue '{queue_name}' created successfully.")
+            logger.info("Queue '%s' found.", queue_name)
         except ClientError as e:
-            if "NonExistentQueue" in str(e):
-                logger.warning(f"Queue '{queue_name}' not found. Creating a new queue.")
-                queue = sqs_resource.create_queue(QueueName=queue_name)
-                logger.info(f"Queue '{queue_name}' created successfully.")
+            if not isinstance(e, _QueueDoesNotExist) and (
+                e.response["Error"]["Code"] not in _NONEXISTENT_QUEUE_CODES
+            ):
+                raise
+            logger.warning("Queue '%s' not found. Creating a new queue.", queue_name)
+            queue = sqs_resource.create_queue(QueueName=queue_name)
+            logger.info("Queue '%s' created successfully.", queue_name)
         return queue.url
 
     @property
     def size(self) -> int:
-        queue = sqs_resource.Queue(self.queue_url)
-        return int(queue.attributes["ApproximateNumberOfMessages"])
+        # ApproximateNumberOfMessages is already approximate, so a briefly
+        # stale value saves a GetQueueAttributes call on every access
+        now = time.monotonic()
+        if self._size is None or now - self._size_time >= SIZE_CACHE_TTL:
+            self._queue.reload()
+            self._size = int(self._queue.attributes["ApproximateNumberOfMessages"])
+            self._size_time = now
+        return self._size
 
-    def upload(self, messages: list, max_retries: int = 3, sleep_time: int = 5) -> None:
-        messages = [
-            {
-                "Id": f"{i}",
-                "MessageBody": (
-                    message if isinstance(message, str) else json.dumps(message)
-                ),
-            }
-            for i, message in enumerate(messages)
-        ]
-        batch_size = 10
-        batches = [
-            (messages[i : i + batch_size], self.queue_url)
-            for i in range(0, len(messages), batch_size)
-        ]
-        if len(batches) < multiprocessing.cpu_count():
-            logger.info("Uploading batches sequentially.")
-            for batch in tqdm(batches):
-                for retry in range(max_retries):
-                    try:
-                        _upload_batch(batch)
-                        break  # If successful, break the retry loop
-                    except botocore.parsers.ResponseParserError as e:
-                        if (
-                            retry < max_retries - 1
-                        ):  # If not the last retry, sleep and retry
-                            time.sleep(sleep_time)
-                        else:  # If last retry, raise the exception
-                            raise e
+    @staticmethod
+    def _make_batches(messages: list) -> Iterator[list]:
+        # check the handful of distinct types once so homogeneous inputs (the
+        # common case) are encoded without a per-message branch
+        is_str = [issubclass(t, str) for t in set(map(type, messages))]
+        if not any(is_str):
+            bodies = map(_encode_body, messages)
+        elif all(is_str):
+            bodies = iter(messages)
         else:
-            # use tqdm and multiprocessing to upload the batches
-            with Pool(multiprocessing.cpu_count()) as p:
-                for result in tqdm(
-                    p.imap(
-                        _upload_batch_with_retry,
-                        [(batch, max_retries, sleep_time) for batch in batches],
-                    ),
-                    total=len(batches),
-                ):
-                    if isinstance(
-                        result, Exception
-                    ):  # If an exception occurred in any worker, raise it
-                        raise result
-
-    def get_next(self, max_messages: int = 1, visibility_timeout: int = 30) -> list:
-        queue = sqs_resource.Queue(self.queue_url)
-        response = queue.receive_messages(
-            MaxNumberOfMessages=max_messages, VisibilityTimeout=visibility_timeout
+            bodies = (
+                message if isinstance(message, str) else _encode_body(message)
+                for message in messages
+            )
+        entries = (
+            {"Id": str(i), "MessageBody": body} for i, body in enumerate(bodies)
         )
-        message = response[0]
-        if message.body.startswith("{"):
-            item = json.loads(message.body)
-        else:
-            item = message.body
-        return message, item
+        return chunks(entries, BATCH_SIZE)
 
-    def delete(self, message) -> None:
-        sqs_client.delete_message(
-            QueueUrl=self.queue_url, ReceiptHandle=message.receipt_handle
+    def upload(self, messages: list, max_retries: int = 3, sleep_time: int = 5) -> None:
+        batches = self._make_batches(messages)
+        send = partial(self._send_one, max_retries=max_retries, sleep_time=sleep_time)
+        # boto3 clients are thread-safe, so all workers share sqs_client and its
+        # connection pool
+        with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+            for _ in tqdm(
+                map_bounded(executor, send, batches, 2 * UPLOAD_WORKERS),
+                total=math.ceil(len(messages) / BATCH_SIZE),
+            ):
+                pass
+
+    async def upload_async(self, messages: list, max_concurrency: int = 64) -> None:
+        """Upload messages to the queue using asyncio.
+
+        Requires aiobotocore, which can be installed with ``pip install moto3[async]``.
+
+        Args:
+            messages (list): The messages to upload. Non-string messages are
+                JSON encoded.
+            max_concurrency (int, optional): The maximum number of in-flight
+                send_message_batch requests. Defaults to 64.
+        """
+        from aiobotocore.session import get_session
+
+        batches = self._make_batches(messages)
+        async with get_session().create_client("sqs", config=client_config) as client:
+            # as in upload, only create a task once a slot is free, so batches
+            # are not all encoded up front
+            pending: set = set()
+            for batch in batches:
+                if len(pending) >= max_concurrency:
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        task.result()
+                pending.add(
+                    asyncio.ensure_future(
+                        client.send_message_batch(
+                            QueueUrl=self.queue_url, Entries=batch
+                        )
+                    )
+                )
+            if pending:
+                await asyncio.gather(*pending)
+
+    def _send_one(self, batch: list, max_retries: int = 3, sleep_time: int = 5) -> None:
+        # botocore retries throttling and connection errors itself, but not a
+        # response it fails to parse, so those are retried here
+        for retry in range(max_retries):
+            try:
+                sqs_client.send_message_batch(QueueUrl=self.queue_url, Entries=batch)
+                return
+            except ResponseParserError:
+                if retry == max_retries - 1:
+                    raise
+                time.sleep(sleep_time)
+
+    def get_next(
+        self, max_messages: int = 1, visibility_timeout: int = 30, wait_time: int = 20
+    ) -> Tuple[Any, Any]:
+        """Receive messages from the queue.
+
+        Args:
+            max_messages (int, optional): The maximum number of messages to
+                receive, up to 10. Defaults to 1.
+            visibility_timeout (int, optional): How long, in seconds, received
+                messages are hidden from other consumers. Defaults to 30.
+            wait_time (int, optional): How long, in seconds, to long-poll for
+                messages before returning empty-handed. Defaults to 20.
+
+        Returns:
+            Tuple[Any, Any]: The message and its parsed body when max_messages
+                is 1, or (None, None) if no message arrived. Otherwise, the list
+                of messages and the list of their parsed bodies, which may be
+                shorter than max_messages or empty.
+        """
+        response = self._queue.receive_messages(
+            MaxNumberOfMessages=max_messages,
+            VisibilityTimeout=visibility_timeout,
+            WaitTimeSeconds=wait_time,
         )
+        items = [_parse_body(message.body) for message in response]
+        if max_messages == 1:
+            if not response:
+                return None, None
+            return response[0], items[0]
+        return response, items
+
+    def delete(self, message) -> None:
+        """Delete a received message from the queue.
+
+        Deletes are buffered and sent with delete_many once 10 are pending or
+        delete_flush_interval seconds have passed, whichever comes first. Call
+        flush_deletes() to send any pending deletes immediately.
+
+        Errors from deletes sent after delete_flush_interval are logged rather
+        than raised, since they happen on a background thread; those messages
+        become visible again once their visibility timeout expires. Errors
+        from deletes sent by this call or by flush_deletes() are raised.
+        """
+        with self._delete_lock:
+            self._pending_deletes.append(message)
+            if len(self._pending_deletes) < BATCH_SIZE:
+                if self._delete_timer is None:
+                    self._delete_timer = threading.Timer(
+                        self.delete_flush_interval, self._flush_deletes_on_timer
+                    )
+                    self._delete_timer.start()
+                return
+            messages = self._drain_pending_deletes()
+        self.delete_many(messages)
+
+    def delete_many(self, messages: list) -> None:
+        """Delete received messages from the queue, 10 per request."""
+        for batch in chunks(messages, BATCH_SIZE):
+            response = sqs_client.delete_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=[
+                    {"Id": str(i), "ReceiptHandle": message.receipt_handle}
+                    for i, message in enumerate(batch)
+                ],
+            )
+            for failure in response.get("Failed", []):
+                logger.warning(
+                    "Failed to delete message %s: %s",
+                    batch[int(failure["Id"])].message_id,
+                    failure.get("Message", failure["Code"]),
+                )
+
+    def flush_deletes(self) -> None:
+        """Send any deletes still buffered by delete()."""
+        with self._delete_lock:
+            messages = self._drain_pending_deletes()
+        if messages:
+            self.delete_many(messages)
+
+    def _flush_deletes_on_timer(self) -> None:
+        # there is no caller to raise to on the timer thread, so log instead of
+        # letting the error go to threading.excepthook
+        try:
+            self.flush_deletes()
+        except Exception:
+            logger.exception(
+                "Failed to delete buffered messages from queue '%s'.", self.queue_name
+            )
+
+    def _drain_pending_deletes(self) -> list:
+        if self._delete_timer is not None:
+            self._delete_timer.cancel()
+            self._delete_timer = None
+        messages = list(self._pending_deletes)
+        self._pending_deletes.clear()
+        return messages
 
     def purge(self) -> None:
+        with self._delete_lock:
+            self._drain_pending_deletes()
         sqs_client.purge_queue(QueueUrl=self.queue_url)
+        self._size = None
 
 
 class LocalQueueManager:
     def __init__(self, local_file: str) -> None:
-        if not local_file.endswith(".json"):
-            raise ValueError("Local file must be a JSON file.")
+        """Create a new LocalQueueManager instance.
+
+        Args:
+            local_file (str): The path to the messages, either a ".json" file
+                holding a JSON array or a ".jsonl" file with one JSON message
+                per line.
+        """
+        if not local_file.endswith((".json", ".jsonl")):
+            raise ValueError("Local file must be a JSON or JSON Lines file.")
         self.local_file = local_file
-        with open(local_file, "r") as f:
-            self.messages = json.load(f)
-        self.current_index = 0
+        # consumed messages are popped, so memory is bounded by the unread ones
+        with open(local_file, "rb") as f:
+            if local_file.endswith(".jsonl"):
+                self.messages = deque(orjson.loads(line) for line in f if line.strip())
+            else:
+                self.messages = deque(orjson.loads(f.read()))
 
     @property
     def size(self) -> int:
+        """The number of messages that have not been consumed yet."""
         return len(self.messages)
 
     def upload(self, messages: list) -> None:
         self.messages.extend(messages)
 
     def get_next(
-        self, max_messages: int = 1, visibility_timeout: Optional[int] = None
+        self,
+        max_messages: int = 1,
+        visibility_timeout: Optional[int] = None,
+        wait_time: Optional[int] = None,
     ) -> Tuple[None, Any]:
         if visibility_timeout is not None:
             # log a warning if visibility_timeout is not None
@@ -156,12 +324,19 @@ class LocalQueueManager:
                 "Visibility timeout is not supported for local queues. "
                 "This argument will be ignored."
             )
+        if wait_time is not None:
+            logger.warning(
+                "Wait time is not supported for local queues. "
+                "This argument will be ignored."
+            )
         if max_messages == 1:
-            out = self.messages[self.current_index]
-            self.current_index += 1
-            return None, out
-        out = self.messages[self.current_index : self.current_index + max_messages]
-        self.current_index += max_messages
+            if not self.messages:
+                return None, None
+            return None, self.messages.popleft()
+        out = [
+            self.messages.popleft()
+            for _ in range(min(max_messages, len(self.messages)))
+        ]
         return None, out
 
     def delete(self, message) -> None:
@@ -170,6 +345,15 @@ class LocalQueueManager:
             "This argument will be ignored."
         )
 
+    def delete_many(self, messages: list) -> None:
+        logger.warning(
+            "delete_many is not supported for local queues. "
+            "This argument will be ignored."
+        )
+
+    def flush_deletes(self) -> None:
+        pass
+
     def purge(self) -> None:
         logger.warning(
             "purge is not supported for local queues. " "This argument will be ignored."
@@ -1,30 +1,122 @@
-import logging
+import io
 import os
 import shutil
-from datetime import datetime, timedelta
-from typing import Optional
-from tenacity import retry, stop_after_attempt, wait_exponential
+import string
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import chain, islice
+from typing import IO, Any, Iterable, Iterator, List, Optional, Set, Tuple
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
 import boto3
+from boto3.s3.transfer import TransferConfig
 from tqdm import tqdm
 
-# Configure the logger
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.INFO)
+from moto3._config import make_client_config
+from moto3._log import get_logger
+from moto3._utils import chunks, map_bounded
 
-handler = logging.StreamHandler()
-formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-handler.setFormatter(formatter)
-logger.addHandler(handler)
+logger = get_logger(__name__)
 
 region_name = "us-west-2"
-s3_client = boto3.client("s3")
-s3_resource = boto3.resource("s3")
+client_config = make_client_config(max_attempts=10)
+# only the S3 client is pinned to region_name, so CloudWatch and DynamoDB keep
+# using the caller's region. requests use virtual-hosted addressing against the
+# region_name endpoint (bucket.s3.us-west-2.amazonaws.com); buckets in other
+# regions are still reached through botocore's region redirect
+s3_config = client_config.merge(
+    Config(region_name=region_name, s3={"addressing_style": "virtual"})
+)
+s3_client = boto3.client("s3", config=s3_config)
+
+# buckets create_bucket has already confirmed, so it checks each one only once
+_known_buckets: Set[str] = set()
+
+# only built on first use, since most callers never need it
+_cloudwatch_client = None
+
+
+def _get_cloudwatch_client():
+    global _cloudwatch_client
+    if _cloudwatch_client is None:
+        _cloudwatch_client = boto3.client("cloudwatch", config=client_config)
+    return _cloudwatch_client
+
+
+_dynamodb_client = None
+
+
+def _get_dynamodb_client():
+    global _dynamodb_client
+    if _dynamodb_client is None:
+        _dynamodb_client = boto3.client("dynamodb", config=client_config)
+    return _dynamodb_client
+
+
+_accelerated_s3_client = None
+
+
+def _get_accelerated_s3_client():
+    global _accelerated_s3_client
+    if _accelerated_s3_client is None:
+        _accelerated_s3_client = boto3.client(
+            "s3",
+            config=s3_config.merge(Config(s3={"use_accelerate_endpoint": True})),
+        )
+    return _accelerated_s3_client
+
+
+# the maximum number of keys S3 accepts in a single delete_objects call
+DELETE_BATCH_SIZE = 1000
+
+# the maximum number of requests DynamoDB accepts in a single batch_write_item call
+INDEX_BATCH_SIZE = 25
+
+# the IndexedS3Manager table index with last_modified as its range key
+LAST_MODIFIED_INDEX = "last_modified-index"
+
+# the maximum number of entries kept by each S3Manager metadata cache
+METADATA_CACHE_SIZE = 100_000
+
+# the characters list_all_files splits the key range at when listing in parallel
+PARTITION_ALPHABET = string.ascii_lowercase + string.digits + "-_/"
+
+# larger parts and more threads than the boto3 defaults (8MB, 10) for big files
+transfer_config = TransferConfig(
+    multipart_threshold=16 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=32,
+    use_threads=True,
+    io_chunksize=1024 * 1024,
+)
+
+
+def _timestamp(date: datetime) -> str:
+    # fixed-width UTC strings sort in time order, as the index range key needs
+    return date.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _split_bucket_name(bucket_name: str) -> Tuple[str, str, str]:
+    # returns the bucket, its directory path and the prefix keys are built from
+    if "/" not in bucket_name:
+        return bucket_name, "", ""
+    name = bucket_name.split("/")[0]
+    dirpath = bucket_name[len(name) + 1 :]
+    # S3 keys always use "/", whatever the local os.path.sep is
+    prefix = dirpath.rstrip("/") + "/" if dirpath else ""
+    return name, dirpath, prefix
 
 
 class S3Manager:
-    def __init__(self, bucket_name: str):
+    def __init__(
+        self,
+        bucket_name: str,
+        metadata_ttl: float = 0,
+        accelerate: bool = False,
+        skip_create: bool = False,
+    ):
         """Create a new S3Manager instance.
 
         If the bucket does not exist, it will be created.
@@ -35,29 +127,51 @@ class S3Manager:
                 In such a case, only my-bucket will be created and
                 my-dir will be used as the directory path for all
                 operations.
+            metadata_ttl (float, optional): How long, in seconds, results of
+                exists() and list_all_files() are reused. Writes made through
+                this instance invalidate them, but changes made elsewhere may
+                go unnoticed for up to this long. Defaults to 0, which
+                disables caching.
+            accelerate (bool, optional): Whether to send object requests through
+                the S3 Transfer Acceleration endpoint, which routes them over
+                the AWS edge network. Transfer Acceleration must be enabled on
+                the bucket. Defaults to False.
+            skip_create (bool, optional): Whether to assume the bucket exists
+                and skip checking for it. Defaults to False.
         """
-        if "/" in bucket_name:
-            self.bucket_name = bucket_name.split("/")[0]
-            self.dirpath = bucket_name[len(self.bucket_name) + 1 :]
-        else:
-            self.bucket_name = bucket_name
-            self.dirpath = ""
-        S3Manager.create_bucket(self.bucket_name)
+        self.metadata_ttl = metadata_ttl
+        self._s3_client = _get_accelerated_s3_client() if accelerate else s3_client
+        self._exists_cache: dict = {}
+        self._listing_cache: dict = {}
+        self.bucket_name, self.dirpath, self._prefix = _split_bucket_name(bucket_name)
+        if not skip_create:
+            S3Manager.create_bucket(self.bucket_name)
 
     @staticmethod
     def create_bucket(bucket_name: str) -> None:
+        if bucket_name in _known_buckets:
+            return
+        try:
+            s3_client.head_bucket(Bucket=bucket_name)
+            logger.info("Bucket '%s' found.", bucket_name)
+            _known_buckets.add(bucket_name)
+            return
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("404", "NoSuchBucket"):
+                raise
+
+        logger.info("Bucket '%s' not found. Creating a new bucket.", bucket_name)
         try:
-            s3_resource.meta.client.head_bucket(Bucket=bucket_name)
-            logger.info(f"Bucket '{bucket_name}' found.")
-        except s3_client.exceptions.ClientError:
-            logger.info(f"Bucket '{bucket_name}' not found. Creating a new bucket.")
             s3_client.create_bucket(
                 Bucket=bucket_name,
                 CreateBucketConfiguration={"LocationConstraint": region_name},
             )
-            logger.info(f"Bucket '{bucket_name}' created successfully.")
-        except s3_client.exceptions.BucketAlreadyOwnedByYou:
-            logger.info(f"Bucket '{bucket_name}' found.")
+            logger.info("Bucket '%s' created successfully.", bucket_name)
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "BucketAlreadyOwnedByYou":
+                raise
+            logger.info("Bucket '%s' found.", bucket_name)
+        _known_buckets.add(bucket_name)
 
     @staticmethod
     def list_buckets() -> list:
@@ -67,33 +181,67 @@ class S3Manager:
         )
         return [bucket["Name"] for bucket in sorted_buckets]
 
-    @retry(
-        stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1, min=4, max=10)
-    )
     def upload(self, obj: str, key: str) -> None:
-        file_path = os.path.join(self.dirpath, key)
-        try:
-            s3_client.put_object(Bucket=self.bucket_name, Key=file_path, Body=obj)
-        except ClientError as e:
-            if e.response["Error"]["Code"] == "SlowDown":
-                print("Exceeded request rate. Retrying...")
-                raise
-            else:
-                raise  # re-throw the last exception if SlowDown was not the cause
+        # SlowDown and other throttling errors are retried by botocore's
+        # adaptive retry mode
+        file_path = self._prefix + key
+        self._s3_client.put_object(Bucket=self.bucket_name, Key=file_path, Body=obj)
+        self._invalidate(file_path)
 
     def delete(self, key: str) -> None:
-        file_path = os.path.join(self.dirpath, key)
-        s3_client.delete_object(Bucket=self.bucket_name, Key=file_path)
+        file_path = self._prefix + key
+        self._s3_client.delete_object(Bucket=self.bucket_name, Key=file_path)
+        self._invalidate(file_path)
 
-    def upload_file(self, file_path: str, key: str) -> None:
+    def delete_many(self, keys: Iterable[str], workers: int = 8) -> None:
+        """Delete files from S3, up to 1000 per DeleteObjects request.
+
+        Args:
+            keys (Iterable[str]): The keys of the files to delete.
+            workers (int, optional): The number of requests to send
+                concurrently. Defaults to 8.
+        """
+        file_paths = (self._prefix + key for key in keys)
+        batches = chunks(file_paths, DELETE_BATCH_SIZE)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for _ in map_bounded(executor, self._delete_batch, batches, 2 * workers):
+                pass
+
+    def _delete_batch(self, file_paths: list) -> Set[str]:
+        response = self._s3_client.delete_objects(
+            Bucket=self.bucket_name,
+            Delete={"Objects": [{"Key": path} for path in file_paths], "Quiet": True},
+        )
+        for file_path in file_paths:
+            self._invalidate(file_path)
+        # in quiet mode only the failed deletions are reported
+        failed = set()
+        for error in response.get("Errors", []):
+            logger.warning(
+                "Failed to delete '%s': %s", error["Key"], error.get("Message")
+            )
+            failed.add(error["Key"])
+        return failed
+
+    def upload_file(
+        self, file_path: str, key: str, config: Optional[TransferConfig] = None
+    ) -> None:
         """Upload a file to S3.
 
         Args:
             file_path (str): The path to the file to upload.
             key (str): The key to use for the file in S3.
+            config (TransferConfig, optional): The multipart transfer settings.
+                Defaults to the module-level transfer_config.
         """
-        upload_path = os.path.join(self.dirpath, key)
-        s3_client.upload_file(file_path, self.bucket_name, upload_path)
+        upload_path = self._prefix + key
+        self._s3_client.upload_file(
+            file_path,
+            self.bucket_name,
+            upload_path,
+            Config=transfer_config if config is None else config,
+        )
+        self._invalidate(upload_path)
 
     def read_file(self, key: str, decode: Optional[str] = "utf-8") -> str:
         """Read a file from S3.
@@ -105,72 +253,374 @@ class S3Manager:
         Returns:
             str: The contents of the file.
         """
-        s3_file_path = os.path.join(self.dirpath, key)
-        obj = s3_resource.Object(self.bucket_name, s3_file_path)
-        obj = obj.get()["Body"].read()
+        if decode not in ("utf-8", None):
+            raise ValueError(f"Unsupported decode type: {decode}")
+        obj = self.read_bytes(key)
         if decode == "utf-8":
             obj = obj.decode("utf-8")
-        elif decode is None:
-            pass
-        else:
-            raise ValueError(f"Unsupported decode type: {decode}")
         return obj
 
-    def exists(self, key: str) -> bool:
+    def read_bytes(self, key: str) -> bytes:
+        """Read the raw contents of a file from S3.
+
+        Args:
+            key (str): The key to use for the file in S3.
+
+        Returns:
+            bytes: The contents of the file.
+        """
+        s3_file_path = self._prefix + key
+        response = self._s3_client.get_object(Bucket=self.bucket_name, Key=s3_file_path)
+        return response["Body"].read()
+
+    def open_file(self, key: str) -> IO[str]:
+        """Open a UTF-8 file in S3 as a text stream.
+
+        Unlike read_file, the contents are decoded as they are read, so
+        iterating over the lines of a large file never holds the whole
+        file in memory. Use it as a context manager to close the
+        connection when done.
+
+        Args:
+            key (str): The key to use for the file in S3.
+
+        Returns:
+            IO[str]: A readable text stream over the contents of the file.
+        """
+        s3_file_path = self._prefix + key
+        response = self._s3_client.get_object(Bucket=self.bucket_name, Key=s3_file_path)
+        # unlike a codecs reader, TextIOWrapper only splits lines on newlines,
+        # not on U+2028 and the like, which orjson leaves unescaped
+        return io.TextIOWrapper(response["Body"], encoding="utf-8")
+
+    def exists(self, key: str, prefix: bool = False) -> bool:
         """Check if a file exists in S3.
 
         Args:
             key (str): The key to use for the file in S3.
+            prefix (bool, optional): If True, check whether any file starts
+                with key instead of looking for an exact match. Defaults to False.
 
         Returns:
             bool: True if the file exists, False otherwise.
         """
-        s3_file_path = os.path.join(self.dirpath, key)
-        results = s3_client.list_objects(Bucket=self.bucket_name, Prefix=s3_file_path)
-        return "Contents" in results
+        s3_file_path = self._prefix + key
+        if prefix:
+            # any write under the prefix can change the answer, so these live
+            # with the listings, which every write clears
+            cache, cache_key = self._listing_cache, ("exists", s3_file_path)
+        else:
+            cache, cache_key = self._exists_cache, s3_file_path
+        cached = self._cache_get(cache, cache_key)
+        if cached is not None:
+            return cached
+
+        if prefix:
+            response = self._s3_client.list_objects_v2(
+                Bucket=self.bucket_name, Prefix=s3_file_path, MaxKeys=1
+            )
+            found = response["KeyCount"] > 0
+        else:
+            try:
+                self._s3_client.head_object(Bucket=self.bucket_name, Key=s3_file_path)
+                found = True
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in ("404", "NoSuchKey"):
+                    raise
+                found = False
+        self._cache_put(cache, cache_key, found)
+        return found
 
-    def download_file(self, key: str, file_path: str) -> None:
-        s3_file_path = os.path.join(self.dirpath, key)
-        s3_client.download_file(self.bucket_name, s3_file_path, file_path)
+    def download_file(
+        self, key: str, file_path: str, config: Optional[TransferConfig] = None
+    ) -> None:
+        """Download a file from S3.
+
+        Args:
+            key (str): The key of the file in S3.
+            file_path (str): The local path to write the file to.
+            config (TransferConfig, optional): The multipart transfer settings.
+                Defaults to the module-level transfer_config.
+        """
+        s3_file_path = self._prefix + key
+        self._s3_client.download_file(
+            self.bucket_name,
+            s3_file_path,
+            file_path,
+            Config=transfer_config if config is None else config,
+        )
 
-    @retry(
-        stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1, min=4, max=10)
-    )
     def list_all_files(
         self,
         prefix: str = "",
         max_files: Optional[int] = None,
         show_progress: bool = True,
         last_modified_hours: Optional[int] = None,
+        workers: int = 1,
+        alphabet: str = PARTITION_ALPHABET,
     ) -> list:
-        bucket = s3_resource.Bucket(self.bucket_name)
-        prefix_path = os.path.join(self.dirpath, prefix)
-        filtered_objects = bucket.objects.filter(Prefix=prefix_path)
-
-        if last_modified_hours is not None:
-            first_obj_tz = next(iter(filtered_objects)).last_modified.tzinfo
-            min_last_modified_date = datetime.now(first_obj_tz) - timedelta(
-                hours=last_modified_hours
+        """List the keys in the bucket.
+
+        Args:
+            prefix (str, optional): Only list keys starting with this prefix.
+                Defaults to "".
+            max_files (int, optional): The maximum number of keys to return.
+                Defaults to None, which returns every key.
+            show_progress (bool, optional): Whether to show a progress bar.
+                Defaults to True.
+            last_modified_hours (int, optional): Only list keys modified within
+                this many hours. Defaults to None, which disables the filter.
+            workers (int, optional): The number of threads listing in parallel.
+                With more than one, the key range under prefix is split at
+                prefix + c for each character c in alphabet and every range is
+                paginated by its own thread. Defaults to 1, a single serial
+                listing, which is cheaper for small prefixes.
+            alphabet (str, optional): The characters used to split the key
+                range when workers > 1. Every key is listed whatever its
+                characters; the alphabet only decides where the ranges start.
+                Defaults to lowercase letters, digits and "-_/".
+
+        Returns:
+            list: The keys in S3 order, relative to the directory path of the
+                instance.
+        """
+        cache_key = ("list", prefix, max_files, last_modified_hours)
+        cached = self._cache_get(self._listing_cache, cache_key)
+        if cached is not None:
+            return list(cached)
+
+        if workers <= 1:
+            file_keys = list(
+                self.iter_all_files(
+                    prefix=prefix,
+                    max_files=max_files,
+                    show_progress=show_progress,
+                    last_modified_hours=last_modified_hours,
+                )
+            )
+        else:
+            file_keys = self._list_partitioned(
+                prefix, max_files, show_progress, last_modified_hours, workers, alphabet
             )
-            filtered_objects = [
-                obj
-                for obj in filtered_objects
-                if obj.last_modified > min_last_modified_date
+        self._cache_put(self._listing_cache, cache_key, tuple(file_keys))
+        return file_keys
+
+    def _list_partitioned(
+        self,
+        prefix: str,
+        max_files: Optional[int],
+        show_progress: bool,
+        last_modified_hours: Optional[int],
+        workers: int,
+        alphabet: str,
+    ) -> list:
+        prefix_path = self._prefix + prefix
+        min_last_modified_date = self._min_last_modified_date(last_modified_hours)
+        # S3 lists keys in UTF-8 byte order, which matches Python's str ordering,
+        # so consecutive (start_after, end] ranges cover every key exactly once
+        bounds = [None] + [prefix_path + c for c in sorted(set(alphabet))] + [None]
+        file_keys = []
+        pbar = tqdm(total=max_files) if show_progress else None
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    self._list_partition,
+                    prefix_path,
+                    start_after,
+                    end,
+                    max_files,
+                    min_last_modified_date,
+                )
+                for start_after, end in zip(bounds[:-1], bounds[1:])
             ]
+            for future in futures:
+                keys = future.result()
+                if max_files is not None:
+                    keys = keys[: max_files - len(file_keys)]
+                file_keys.extend(keys)
+                if pbar is not None:
+                    pbar.update(len(keys))
+                if max_files is not None and len(file_keys) >= max_files:
+                    for remaining in futures:
+                        remaining.cancel()
+                    break
+        if pbar is not None:
+            pbar.close()
 
-        if max_files is None:
-            out_iter = tqdm(filtered_objects) if show_progress else filtered_objects
-            file_keys = [obj.key for obj in out_iter]
-        else:
-            out_iter = zip(range(max_files), filtered_objects)
-            if show_progress:
-                out_iter = tqdm(out_iter, total=max_files)
-            file_keys = [obj.key for _, obj in out_iter]
+        prefix_len = len(self._prefix)
+        return [key[prefix_len:] for key in file_keys]
 
-        if self.dirpath:
-            file_keys = [key[len(self.dirpath) + 1 :] for key in file_keys]
+    def iter_all_files(
+        self,
+        prefix: str = "",
+        max_files: Optional[int] = None,
+        show_progress: bool = True,
+        last_modified_hours: Optional[int] = None,
+    ) -> Iterator[str]:
+        """Lazily iterate over the keys in the bucket.
 
-        return file_keys
+        Pages are only requested from S3 as the keys are consumed, so
+        stopping early (or setting max_files) skips the remaining pages.
+
+        Args:
+            prefix (str, optional): Only yield keys starting with this prefix.
+                Defaults to "".
+            max_files (int, optional): The maximum number of keys to yield.
+                Defaults to None, which yields every key.
+            show_progress (bool, optional): Whether to show a progress bar.
+                Defaults to True.
+            last_modified_hours (int, optional): Only yield keys modified within
+                this many hours. Defaults to None, which disables the filter.
+
+        Yields:
+            str: The keys, relative to the directory path of the instance.
+        """
+        prefix_path = self._prefix + prefix
+        min_last_modified_date = self._min_last_modified_date(last_modified_hours)
+
+        pagination_config = {"PageSize": 1000}
+        if max_files is not None and min_last_modified_date is None:
+            # every listed key is yielded, so don't ask S3 for more than needed
+            pagination_config = {
+                "PageSize": max(1, min(max_files, 1000)),
+                "MaxItems": max_files,
+            }
+        pages = self._iter_key_pages(
+            prefix_path, pagination_config, min_last_modified_date
+        )
+        yield from self._yield_keys(pages, max_files, show_progress)
+
+    def _yield_keys(
+        self, pages: Iterator[list], max_files: Optional[int], show_progress: bool
+    ) -> Iterator[str]:
+        # the progress bar ticks once per page rather than once per key
+        pbar = tqdm(total=max_files) if show_progress else None
+        remaining = max_files
+        prefix_len = len(self._prefix)
+        try:
+            for keys in pages:
+                if remaining is not None:
+                    keys = keys[:remaining]
+                    remaining -= len(keys)
+                if pbar is not None:
+                    pbar.update(len(keys))
+                for key in keys:
+                    yield key[prefix_len:]
+                if remaining is not None and remaining <= 0:
+                    break
+        finally:
+            if pbar is not None:
+                pbar.close()
+
+    @staticmethod
+    def _min_last_modified_date(
+        last_modified_hours: Optional[int],
+    ) -> Optional[datetime]:
+        if last_modified_hours is None:
+            return None
+        return datetime.now(timezone.utc) - timedelta(hours=last_modified_hours)
+
+    def _iter_key_pages(
+        self,
+        prefix_path: str,
+        pagination_config: dict,
+        min_last_modified_date: Optional[datetime],
+        start_after: Optional[str] = None,
+        end: Optional[str] = None,
+    ) -> Iterator[list]:
+        """Yield the full keys under prefix_path, one list per page.
+
+        If given, only keys in (start_after, end] are yielded.
+        """
+        kwargs = {} if start_after is None else {"StartAfter": start_after}
+        paginator = self._s3_client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(
+            Bucket=self.bucket_name,
+            Prefix=prefix_path,
+            PaginationConfig=pagination_config,
+            **kwargs,
+        )
+        for page in pages:
+            contents = page.get("Contents", [])
+            past_end = end is not None and contents and contents[-1]["Key"] > end
+            yield [
+                obj["Key"]
+                for obj in contents
+                if (end is None or obj["Key"] <= end)
+                and (
+                    min_last_modified_date is None
+                    or obj["LastModified"] > min_last_modified_date
+                )
+            ]
+            if past_end:
+                return
+
+    def _list_partition(
+        self,
+        prefix_path: str,
+        start_after: Optional[str],
+        end: Optional[str],
+        max_files: Optional[int],
+        min_last_modified_date: Optional[datetime],
+    ) -> list:
+        pages = self._iter_key_pages(
+            prefix_path,
+            {"PageSize": 1000},
+            min_last_modified_date,
+            start_after=start_after,
+            end=end,
+        )
+        return list(islice(chain.from_iterable(pages), max_files))
+
+    def list_all_files_parallel(
+        self, prefixes: Optional[List[str]] = None, workers: int = 16
+    ) -> list:
+        """List the keys under several prefixes concurrently.
+
+        S3 scales request throughput per key prefix, so listing disjoint
+        prefixes from separate threads is much faster than paginating one
+        large listing serially.
+
+        Args:
+            prefixes (List[str], optional): The prefixes to list, relative to
+                the directory path of the instance. They should not overlap,
+                otherwise keys are returned more than once. Defaults to None,
+                which lists every key, split into key ranges as with
+                list_all_files(workers=...).
+            workers (int, optional): The number of listing threads.
+                Defaults to 16.
+
+        Returns:
+            list: The keys, grouped in the order of prefixes.
+        """
+        if prefixes is None:
+            return self._list_partitioned(
+                "", None, False, None, workers, PARTITION_ALPHABET
+            )
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(
+                chain.from_iterable(executor.map(self._list_one_prefix, prefixes))
+            )
+
+    def _list_one_prefix(self, prefix: str) -> list:
+        return list(self.iter_all_files(prefix=prefix, show_progress=False))
+
+    def _cache_get(self, cache: dict, cache_key: Any) -> Any:
+        entry = cache.get(cache_key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def _cache_put(self, cache: dict, cache_key: Any, value: Any) -> None:
+        if self.metadata_ttl <= 0:
+            return
+        if len(cache) >= METADATA_CACHE_SIZE:
+            cache.clear()
+        cache[cache_key] = (time.monotonic() + self.metadata_ttl, value)
+
+    def _invalidate(self, s3_file_path: str) -> None:
+        self._exists_cache.pop(s3_file_path, None)
+        self._listing_cache.clear()
 
     def get_file_count(self, days_ago: int = 5):
         """Get the number of files in the bucket for each day in the past.
@@ -178,31 +628,37 @@ class S3Manager:
         Warning - this method will ignore the directory path if one was
         specified when creating the S3Manager instance.
         """
-        cloudwatch = boto3.client("cloudwatch")
-        daily_counts = []
-
-        for i in range(days_ago, 0, -1):
-            start_time = datetime.now() - timedelta(days=i)
-            end_time = start_time + timedelta(days=1)
-            response = cloudwatch.get_metric_statistics(
-                Namespace="AWS/S3",
-                MetricName="NumberOfObjects",
-                Dimensions=[
-                    {"Name": "BucketName", "Value": self.bucket_name},
-                    {"Name": "StorageType", "Value": "AllStorageTypes"},
-                ],
-                StartTime=start_time,
-                EndTime=end_time,
-                Period=86400,  # 24 hours in seconds
-                Statistics=["Average"],
-            )
-
-            if response["Datapoints"]:
-                total_objects = response["Datapoints"][0]["Average"]
-                daily_counts.append((start_time.date(), total_objects))
-
-        # Sort the list by date in descending order (latest counts first)
-        daily_counts.sort(key=lambda x: x[0], reverse=True)
+        # align the window to UTC midnight so each period covers one calendar day
+        end_time = datetime.now(timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        response = _get_cloudwatch_client().get_metric_data(
+            MetricDataQueries=[
+                {
+                    "Id": "m1",
+                    "MetricStat": {
+                        "Metric": {
+                            "Namespace": "AWS/S3",
+                            "MetricName": "NumberOfObjects",
+                            "Dimensions": [
+                                {"Name": "BucketName", "Value": self.bucket_name},
+                                {"Name": "StorageType", "Value": "AllStorageTypes"},
+                            ],
+                        },
+                        "Period": 86400,  # 24 hours in seconds
+                        "Stat": "Average",
+                    },
+                }
+            ],
+            StartTime=end_time - timedelta(days=days_ago),
+            EndTime=end_time,
+            ScanBy="TimestampDescending",  # latest counts first
+        )
+        result = response["MetricDataResults"][0]
+        daily_counts = [
+            (timestamp.date(), total_objects)
+            for timestamp, total_objects in zip(result["Timestamps"], result["Values"])
+        ]
 
         # Format the list with dates as "MM-DD-YYYY"
         formatted_daily_counts = [
@@ -212,6 +668,352 @@ class S3Manager:
         return formatted_daily_counts
 
 
+class IndexedS3Manager(S3Manager):
+    def __init__(
+        self,
+        bucket_name: str,
+        table_name: str = "moto3-s3-index",
+        accelerate: bool = False,
+        skip_create: bool = False,
+    ):
+        """Create a new IndexedS3Manager instance.
+
+        An S3Manager that records every key it writes in a DynamoDB table, so
+        exists() is a single GetItem and list_all_files() is a Query instead
+        of an S3 LIST scan. Only writes made through an IndexedS3Manager are
+        recorded; call reindex() to backfill objects written any other way.
+        There is no metadata_ttl, since lookups already go to the index.
+
+        If the bucket or the table do not exist, they will be created.
+
+        Args:
+            bucket_name (str): The name of the bucket to use, which may
+                include a directory path, as with S3Manager.
+            table_name (str, optional): The DynamoDB table holding the index.
+                It can be shared by several buckets. Defaults to
+                "moto3-s3-index".
+            accelerate (bool, optional): As with S3Manager.
+            skip_create (bool, optional): Whether to assume the bucket and the
+                table exist and skip checking for them. Defaults to False.
+        """
+        super().__init__(bucket_name, accelerate=accelerate, skip_create=skip_create)
+        self.table_name = table_name
+        if not skip_create:
+            IndexedS3Manager.create_table(table_name)
+
+    @staticmethod
+    def create_table(table_name: str) -> None:
+        dynamodb_client = _get_dynamodb_client()
+        try:
+            dynamodb_client.describe_table(TableName=table_name)
+            logger.info("Table '%s' found.", table_name)
+            return
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ResourceNotFoundException":
+                raise
+
+        logger.info("Table '%s' not found. Creating a new table.", table_name)
+        dynamodb_client.create_table(
+            TableName=table_name,
+            AttributeDefinitions=[
+                {"AttributeName": "bucket", "AttributeType": "S"},
+                {"AttributeName": "key", "AttributeType": "S"},
+                {"AttributeName": "last_modified", "AttributeType": "S"},
+            ],
+            KeySchema=[
+                {"AttributeName": "bucket", "KeyType": "HASH"},
+                {"AttributeName": "key", "KeyType": "RANGE"},
+            ],
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": LAST_MODIFIED_INDEX,
+                    "KeySchema": [
+                        {"AttributeName": "bucket", "KeyType": "HASH"},
+                        {"AttributeName": "last_modified", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {"ProjectionType": "KEYS_ONLY"},
+                }
+            ],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        dynamodb_client.get_waiter("table_exists").wait(TableName=table_name)
+        logger.info("Table '%s' created successfully.", table_name)
+
+    def upload(self, obj: str, key: str) -> None:
+        super().upload(obj, key)
+        self._index_put(self._prefix + key, datetime.now(timezone.utc))
+
+    def upload_file(
+        self, file_path: str, key: str, config: Optional[TransferConfig] = None
+    ) -> None:
+        super().upload_file(file_path, key, config=config)
+        self._index_put(self._prefix + key, datetime.now(timezone.utc))
+
+    def delete(self, key: str) -> None:
+        super().delete(key)
+        _get_dynamodb_client().delete_item(
+            TableName=self.table_name, Key=self._index_key(self._prefix + key)
+        )
+
+    def _delete_batch(self, file_paths: list) -> Set[str]:
+        failed = super()._delete_batch(file_paths)
+        # objects S3 failed to delete are still there, so they stay indexed
+        self._index_write(
+            [
+                {"DeleteRequest": {"Key": self._index_key(path)}}
+                for path in file_paths
+                if path not in failed
+            ]
+        )
+        return failed
+
+    def exists(self, key: str, prefix: bool = False) -> bool:
+        """Check if a file exists in the index.
+
+        Args:
+            key (str): The key to use for the file in S3.
+            prefix (bool, optional): If True, check whether any file starts
+                with key instead of looking for an exact match. Defaults to False.
+
+        Returns:
+            bool: True if the file exists, False otherwise.
+        """
+        s3_file_path = self._prefix + key
+        dynamodb_client = _get_dynamodb_client()
+        if prefix:
+            response = dynamodb_client.query(
+                TableName=self.table_name,
+                Select="COUNT",
+                Limit=1,
+                **self._prefix_query(s3_file_path),
+            )
+            return response["Count"] > 0
+        response = dynamodb_client.get_item(
+            TableName=self.table_name,
+            Key=self._index_key(s3_file_path),
+            ProjectionExpression="#k",
+            ExpressionAttributeNames={"#k": "key"},
+        )
+        return "Item" in response
+
+    def list_all_files(
+        self,
+        prefix: str = "",
+        max_files: Optional[int] = None,
+        show_progress: bool = True,
+        last_modified_hours: Optional[int] = None,
+        workers: int = 1,
+        alphabet: str = PARTITION_ALPHABET,
+    ) -> list:
+        """List the keys in the index.
+
+        Takes the same arguments as S3Manager.list_all_files; workers and
+        alphabet are ignored since a single Query is already indexed.
+        """
+        return list(
+            self.iter_all_files(
+                prefix=prefix,
+                max_files=max_files,
+                show_progress=show_progress,
+                last_modified_hours=last_modified_hours,
+            )
+        )
+
+    def iter_all_files(
+        self,
+        prefix: str = "",
+        max_files: Optional[int] = None,
+        show_progress: bool = True,
+        last_modified_hours: Optional[int] = None,
+    ) -> Iterator[str]:
+        """Lazily iterate over the keys in the index.
+
+        Takes the same arguments as S3Manager.iter_all_files. Keys are
+        yielded in key order, or from oldest to newest when
+        last_modified_hours is set, since that Query runs on the
+        last-modified index.
+        """
+        prefix_path = self._prefix + prefix
+        if last_modified_hours is None:
+            query = self._prefix_query(prefix_path)
+        else:
+            min_last_modified_date = self._min_last_modified_date(last_modified_hours)
+            query = {
+                "IndexName": LAST_MODIFIED_INDEX,
+                "KeyConditionExpression": "#b = :bucket AND #lm > :min_last_modified",
+                "ExpressionAttributeNames": {"#b": "bucket", "#lm": "last_modified"},
+                "ExpressionAttributeValues": {
+                    ":bucket": {"S": self.bucket_name},
+                    ":min_last_modified": {"S": _timestamp(min_last_modified_date)},
+                },
+            }
+            if prefix_path:
+                query["FilterExpression"] = "begins_with(#k, :prefix)"
+                query["ExpressionAttributeNames"]["#k"] = "key"
+                query["ExpressionAttributeValues"][":prefix"] = {"S": prefix_path}
+        paginator = _get_dynamodb_client().get_paginator("query")
+        pages = paginator.paginate(TableName=self.table_name, **query)
+        key_pages = ([item["key"]["S"] for item in page["Items"]] for page in pages)
+        yield from self._yield_keys(key_pages, max_files, show_progress)
+
+    def list_all_files_parallel(
+        self, prefixes: Optional[List[str]] = None, workers: int = 16
+    ) -> list:
+        """List the keys under several prefixes in the index.
+
+        Takes the same arguments as S3Manager.list_all_files_parallel. Each
+        prefix is a separate Query; without prefixes, the whole index is read
+        with a single Query, as with list_all_files.
+        """
+        if prefixes is None:
+            return self.list_all_files(show_progress=False)
+        return super().list_all_files_parallel(prefixes, workers=workers)
+
+    def reindex(self, prefix: str = "") -> None:
+        """Add the objects already in S3 under prefix to the index.
+
+        Args:
+            prefix (str, optional): Only index keys starting with this prefix.
+                Defaults to "".
+        """
+        paginator = self._s3_client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(
+            Bucket=self.bucket_name, Prefix=self._prefix + prefix
+        )
+        for page in pages:
+            self._index_write(
+                [
+                    {
+                        "PutRequest": {
+                            "Item": self._index_item(obj["Key"], obj["LastModified"])
+                        }
+                    }
+                    for obj in page.get("Contents", [])
+                ]
+            )
+
+    def _prefix_query(self, prefix_path: str) -> dict:
+        # DynamoDB rejects an empty string in a key condition, so begins_with is
+        # only added when there is a prefix to match
+        if not prefix_path:
+            return {
+                "KeyConditionExpression": "#b = :bucket",
+                "ExpressionAttributeNames": {"#b": "bucket"},
+                "ExpressionAttributeValues": {":bucket": {"S": self.bucket_name}},
+            }
+        return {
+            "KeyConditionExpression": "#b = :bucket AND begins_with(#k, :prefix)",
+            "ExpressionAttributeNames": {"#b": "bucket", "#k": "key"},
+            "ExpressionAttributeValues": {
+                ":bucket": {"S": self.bucket_name},
+                ":prefix": {"S": prefix_path},
+            },
+        }
+
+    def _index_key(self, s3_file_path: str) -> dict:
+        return {"bucket": {"S": self.bucket_name}, "key": {"S": s3_file_path}}
+
+    def _index_item(self, s3_file_path: str, last_modified: datetime) -> dict:
+        item = self._index_key(s3_file_path)
+        item["last_modified"] = {"S": _timestamp(last_modified)}
+        return item
+
+    def _index_put(self, s3_file_path: str, last_modified: datetime) -> None:
+        _get_dynamodb_client().put_item(
+            TableName=self.table_name,
+            Item=self._index_item(s3_file_path, last_modified),
+        )
+
+    def _index_write(self, requests: list) -> None:
+        dynamodb_client = _get_dynamodb_client()
+        for i in range(0, len(requests), INDEX_BATCH_SIZE):
+            pending = {self.table_name: requests[i : i + INDEX_BATCH_SIZE]}
+            while True:
+                response = dynamodb_client.batch_write_item(RequestItems=pending)
+                pending = response.get("UnprocessedItems")
+                if not pending:
+                    break
+                # unprocessed items mean the table is throttling, so back off
+                time.sleep(0.1)
+
+
+class AsyncS3Manager:
+    def __init__(self, bucket_name: str, skip_create: bool = False):
+        """Create a new AsyncS3Manager instance.
+
+        The asyncio counterpart of S3Manager, for workloads that issue many
+        small requests: awaiting them together with asyncio.gather overlaps
+        their network round trips. Requires aiobotocore, which can be
+        installed with ``pip install moto3[async]``.
+
+        The client is opened when entering the instance as an async context
+        manager:
+
+            async with AsyncS3Manager("my-bucket/my-dir") as s3:
+                texts = await asyncio.gather(*(s3.aread_file(k) for k in keys))
+
+        Args:
+            bucket_name (str): The name of the bucket to use, which may
+                include a directory path, as with S3Manager. If the bucket
+                does not exist, it will be created.
+            skip_create (bool, optional): Whether to assume the bucket exists
+                and skip checking for it. Defaults to False.
+        """
+        self.bucket_name, self.dirpath, self._prefix = _split_bucket_name(bucket_name)
+        if not skip_create:
+            S3Manager.create_bucket(self.bucket_name)
+        self._client_context = None
+        self._client = None
+
+    async def __aenter__(self) -> "AsyncS3Manager":
+        from aiobotocore.session import get_session
+
+        self._client_context = get_session().create_client("s3", config=s3_config)
+        self._client = await self._client_context.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._client_context.__aexit__(*exc_info)
+        self._client_context = None
+        self._client = None
+
+    async def aupload(self, obj: str, key: str) -> None:
+        file_path = self._prefix + key
+        await self._client.put_object(Bucket=self.bucket_name, Key=file_path, Body=obj)
+
+    async def aread_file(self, key: str, decode: Optional[str] = "utf-8") -> str:
+        """Read a file from S3.
+
+        Args:
+            key (str): The key to use for the file in S3.
+            decode (str, optional): The type of decoding to use. Defaults to "utf-8".
+
+        Returns:
+            str: The contents of the file.
+        """
+        if decode not in ("utf-8", None):
+            raise ValueError(f"Unsupported decode type: {decode}")
+        s3_file_path = self._prefix + key
+        response = await self._client.get_object(
+            Bucket=self.bucket_name, Key=s3_file_path
+        )
+        async with response["Body"] as stream:
+            obj = await stream.read()
+        if decode == "utf-8":
+            obj = obj.decode("utf-8")
+        return obj
+
+    async def aexists(self, key: str) -> bool:
+        s3_file_path = self._prefix + key
+        try:
+            await self._client.head_object(Bucket=self.bucket_name, Key=s3_file_path)
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] not in ("404", "NoSuchKey"):
+                raise
+            return False
+
+
 class LocalStorageManager:
     def __init__(self, root_dir: str):
         self.root_dir = root_dir
@@ -234,6 +1036,10 @@ class LocalStorageManager:
         obj_path = os.path.join(self.root_dir, key)
         os.remove(obj_path)
 
+    def delete_many(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self.delete(key)
+
     def upload_file(self, file_path: str, key: str) -> None:
         # make the key directory
         obj_dir = os.path.join(self.root_dir, os.path.dirname(key))
@@ -248,6 +1054,10 @@ class LocalStorageManager:
         with open(obj_path, "r") as f:
             return f.read()
 
+    def open_file(self, key: str) -> IO[str]:
+        obj_path = os.path.join(self.root_dir, key)
+        return open(obj_path, "r", encoding="utf-8")
+
     def exists(self, key: str) -> bool:
         obj_path = os.path.join(self.root_dir, key)
         return os.path.exists(obj_path)
@@ -258,14 +1068,32 @@ class LocalStorageManager:
         max_files: Optional[int] = None,
         show_progress: bool = True,
     ) -> list:
+        return list(self.iter_all_files(prefix=prefix, max_files=max_files))
+
+    def iter_all_files(
+        self, prefix: str = "", max_files: Optional[int] = None
+    ) -> Iterator[str]:
         dir_to_search = os.path.join(self.root_dir, prefix)
-        file_list = []
-        for root, dirs, files in os.walk(dir_to_search):
-            for file in files:
-                file_list.append(os.path.join(root, file))
-                if max_files is not None and len(file_list) >= max_files:
-                    return file_list
-        return file_list
+        return islice(self._scan_files(dir_to_search), max_files)
+
+    @staticmethod
+    def _scan_files(path: str) -> Iterator[str]:
+        # same order as os.walk: a directory's files, then its subdirectories,
+        # without following symlinked directories
+        try:
+            entries = os.scandir(path)
+        except OSError:
+            return
+        subdirs = []
+        with entries:
+            for entry in entries:
+                if entry.is_dir():
+                    if not entry.is_symlink():
+                        subdirs.append(entry.path)
+                else:
+                    yield entry.path
+        for subdir in subdirs:
+            yield from LocalStorageManager._scan_files(subdir)
 
     def get_file_count(self, days_ago: int = 5):
         return len(self.list_all_files())
@@ -7,9 +7,13 @@ setup(
     install_requires=[
         "boto3",
         "tqdm",
-        "tenacity",
+        "orjson",
         "botocore"
     ],
+    extras_require={
+        "async": ["aiobotocore"],
+        "crt": ["boto3[crt]"],
+    },
     author="Matt Deitke",
     author_email="mattd@allenai.org",
     description="An internal custom wrapper around AWS boto3.",